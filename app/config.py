@@ -1,5 +1,6 @@
-from pydantic_settings import BaseSettings
-from typing import List
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode
+from typing import Annotated, List
 import os
 from dotenv import load_dotenv
 
@@ -10,7 +11,7 @@ class Settings(BaseSettings):
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-    allowed_origins:str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
+    allowed_origins: Annotated[List[str], NoDecode] = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8000"))
     debug: bool = os.getenv("DEBUG", "True").lower() == "true"
@@ -21,6 +22,14 @@ class Settings(BaseSettings):
     openrouter_base_url: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     site_url: str = os.getenv("SITE_URL","http://localhost:3000")
     
+    @field_validator("allowed_origins", mode="before")
+    @classmethod
+    def split_allowed_origins(cls, v):
+        """Parse a comma-separated origins string into a list."""
+        if isinstance(v, str):
+            return [origin.strip() for origin in v.split(",") if origin.strip()]
+        return v
+    
     class Config:
         env_file = ".env"
 
@@ -1,21 +1,55 @@
-from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import NoSuchModuleError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+# Map plain database URLs onto their asyncio drivers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def _is_async(url) -> bool:
+    """Return whether a database URL names an asyncio driver."""
+    try:
+        return url.get_dialect().is_async
+    except NoSuchModuleError:
+        return False
+
+# URLs naming a sync driver (e.g. sqlite+pysqlite, postgresql+psycopg2) are
+# switched to the asyncio driver for the same database
+database_url = make_url(settings.database_url)
+if not _is_async(database_url):
+    backend = database_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"DATABASE_URL uses '{database_url.drivername}', which has no supported asyncio driver; "
+            f"use one of: {', '.join(sorted(set(ASYNC_DRIVERS.values())))}"
+        )
+    database_url = database_url.set(drivername=ASYNC_DRIVERS[backend])
+
 # Create SQLAlchemy engine
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+if database_url.get_backend_name() == "sqlite":
+    engine = create_async_engine(database_url, connect_args={"check_same_thread": False})
+else:
+    engine = create_async_engine(
+        database_url,
+        pool_size=20,
+        max_overflow=20,
+        pool_timeout=10,
+        pool_recycle=1800,
+        pool_pre_ping=True
+    )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create Base class for models
 Base = declarative_base()
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -2,12 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routes import auth_router, chat_router
+from app.services import openrouter_service
 from app.database import engine
 from app.models import User, ChatSession, ChatMessage
 
-# Create database tables
-User.metadata.create_all(bind=engine)
-
 # Create FastAPI app
 app = FastAPI(
     title="AI Chatbot API",
@@ -20,7 +18,7 @@ app = FastAPI(
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.allowed_origins.split(",") if "," in settings.allowed_origins else [settings.allowed_origins],
+    allow_origins=settings.allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -30,6 +28,17 @@ app.add_middleware(
 app.include_router(auth_router)
 app.include_router(chat_router)
 
+@app.on_event("startup")
+async def create_tables():
+    """Create database tables."""
+    async with engine.begin() as conn:
+        await conn.run_sync(User.metadata.create_all)
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close the shared OpenRouter HTTP client."""
+    await openrouter_service.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -25,7 +25,8 @@ class ChatSession(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String, default="New Chat")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Also touched by the touch_session_updated_at trigger whenever a message is added
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="chat_sessions")
@@ -33,6 +34,10 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Serves per-session history reads ordered by time
+        Index("ix_msg_session_created", "session_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"), nullable=False)
@@ -42,3 +47,57 @@ class ChatMessage(Base):
     
     # Relationship
     session = relationship("ChatSession", back_populates="messages")
+
+# create_all skips tables that already exist, so also add the history index to
+# databases created before it was introduced
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL("CREATE INDEX IF NOT EXISTS ix_msg_session_created ON chat_messages (session_id, created_at)")
+)
+
+# Keep chat_sessions.updated_at current whenever a message is added. Statements run on
+# every create_all and skip existing objects, so existing databases get the trigger too
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS touch_session_updated_at
+        AFTER INSERT ON chat_messages
+        BEGIN
+            UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.session_id;
+        END
+    """).execute_if(dialect="sqlite")
+)
+# On PostgreSQL the function and trigger are only created when missing, so restarts
+# take no lock on chat_messages and workers starting together do not race
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL("""
+        DO $do$
+        BEGIN
+            IF to_regprocedure('touch_session_updated_at()') IS NULL THEN
+                CREATE FUNCTION touch_session_updated_at() RETURNS trigger AS $fn$
+                BEGIN
+                    UPDATE chat_sessions SET updated_at = now() WHERE id = NEW.session_id;
+                    RETURN NEW;
+                END;
+                $fn$ LANGUAGE plpgsql;
+            END IF;
+            
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = 'touch_session_updated_at' AND tgrelid = 'chat_messages'::regclass
+            ) THEN
+                CREATE TRIGGER touch_session_updated_at
+                AFTER INSERT ON chat_messages
+                FOR EACH ROW EXECUTE FUNCTION touch_session_updated_at();
+            END IF;
+        EXCEPTION
+            -- Another worker created them first
+            WHEN duplicate_function OR duplicate_object OR unique_violation THEN NULL;
+        END
+        $do$
+    """).execute_if(dialect="postgresql")
+)
@@ -1,22 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from app.database import get_db
-from app.schemas import UserCreate, UserLogin, LoginResponse, UserResponse, APIResponse, Token
+from app.schemas import UserCreate, UserLogin, LoginResponse, UserResponse, APIResponse, Token, AuthCtx
 from app.services import UserService
-from app.utils.auth import create_access_token, verify_token
+from app.utils.auth import create_access_token, decode_token
+from app.utils import auth_cache
 from app.config import settings
+import logging
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
 
 @router.post("/register", response_model=APIResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     try:
         # Check if user already exists
-        existing_user = UserService.get_user_by_email(db, user.email)
+        existing_user = await UserService.get_user_by_email(db, user.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,7 +27,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Create new user
-        new_user = UserService.create_user(db, user)
+        new_user = await UserService.create_user(db, user)
         
         return APIResponse(
             success=True,
@@ -41,11 +44,11 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=LoginResponse)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Authenticate user and return access token."""
     try:
         # Authenticate user
-        user = UserService.authenticate_user(db, user_credentials.email, user_credentials.password)
+        user = await UserService.authenticate_user(db, user_credentials.email, user_credentials.password)
         
         if not user:
             raise HTTPException(
@@ -83,41 +86,25 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user information."""
     try:
-        # Debug: Log incoming request
-        print(f"Debug: Incoming token: {credentials.credentials[:20]}...")
-        
-        # Verify token
-        email = verify_token(credentials.credentials)
-        print(f"Debug: Extracted email from token: {email}")
-        
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        
-        # Get user
-        user = UserService.get_user_by_email(db, email)
-        print(f"Debug: Found user: {user.email if user else 'None'}")
+        email = await _authenticate_token(credentials)
         
+        user = await UserService.get_user_by_email(db, email)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user_response = UserResponse.model_validate(user)
-        print(f"Debug: Returning user response: {user_response.email}")
-        return user_response
+        return UserResponse.model_validate(user)
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Debug: Exception in get_current_user: {str(e)}")
+        logger.error(f"Failed to get current user: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -126,21 +113,36 @@ async def get_current_user(
 # Dependency to get current user
 async def get_current_user_dependency(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> UserResponse:
+    db: AsyncSession = Depends(get_db)
+) -> AuthCtx:
     """Dependency to get current authenticated user."""
-    email = verify_token(credentials.credentials)
-    if email is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
+    email = await _authenticate_token(credentials)
     
-    user = UserService.get_user_by_email(db, email)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    ctx = await auth_cache.get_user(email)
+    if ctx is None:
+        user = await UserService.get_user_by_email(db, email)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        ctx = AuthCtx(user.id, user.email)
+        await auth_cache.set_user(email, ctx)
+    
+    return ctx
+
+async def _authenticate_token(credentials: HTTPAuthorizationCredentials) -> str:
+    """Resolve a bearer token to its email, skipping JWT decode when cached."""
+    key = auth_cache.token_key(credentials.credentials)
+    email = await auth_cache.get_token_email(key)
+    if email is None:
+        payload = decode_token(credentials.credentials)
+        email = payload.get("sub") if payload else None
+        if email is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token"
+            )
+        await auth_cache.set_token_email(key, email, payload.get("exp"))
     
-    return UserResponse.model_validate(user)
+    return email
@@ -1,26 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.schemas import ChatSessionResponse, ChatMessageCreate, ChatMessageResponse, APIResponse
 from app.services import ChatService, openrouter_service
-from app.routes.auth import get_current_user_dependency, UserResponse
+from app.routes.auth import get_current_user_dependency, AuthCtx
+import asyncio
 import logging
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+# Server-sent event framing
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
+SSE_DONE = b"data: [DONE]\n\n"
+
+# List serializers, built once; they render straight to JSON bytes
+sessions_adapter = TypeAdapter(List[ChatSessionResponse])
+messages_adapter = TypeAdapter(List[ChatMessageResponse])
+
+# Title tasks can outlive the stream that started them, so hold a reference until they finish
+_title_tasks = set()
+
+async def _generate_and_save_title(session_id: int, first_message: str) -> None:
+    """Generate a chat title and commit it in its own transaction."""
+    try:
+        new_title = await openrouter_service.generate_chat_title(first_message)
+        async with SessionLocal() as db:
+            await ChatService.update_session_title(db, session_id, new_title)
+        logger.info(f"Updated session {session_id} title to: {new_title}")
+    except Exception as e:
+        logger.error(f"Failed to generate title for session {session_id}: {e}")
+
 @router.get("/sessions", response_model=List[ChatSessionResponse])
 async def get_chat_sessions(
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all chat sessions for the current user."""
     try:
-        sessions = ChatService.get_user_chat_sessions(db, current_user.id)
-        return [ChatSessionResponse.model_validate(session) for session in sessions]
+        sessions = await ChatService.get_user_chat_sessions(db, current_user.id)
+        return Response(
+            sessions_adapter.dump_json(sessions_adapter.validate_python(sessions, from_attributes=True)),
+            media_type="application/json"
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -31,12 +58,12 @@ async def get_chat_sessions(
 @router.post("/sessions", response_model=ChatSessionResponse)
 async def create_chat_session(
     title: str = "New Chat",
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new chat session."""
     try:
-        session = ChatService.create_chat_session(db, current_user.id, title)
+        session = await ChatService.create_chat_session(db, current_user.id, title)
         return ChatSessionResponse.model_validate(session)
     
     except Exception as e:
@@ -49,21 +76,24 @@ async def create_chat_session(
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessageResponse])
 async def get_session_messages(
     session_id: int,
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all messages for a specific chat session."""
     try:
         # Verify session belongs to user
-        session = ChatService.get_session_by_id(db, session_id)
+        session = await ChatService.get_session_by_id(db, session_id)
         if not session or session.user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat session not found"
             )
         
-        messages = ChatService.get_session_messages(db, session_id)
-        return [ChatMessageResponse.model_validate(message) for message in messages]
+        messages = await ChatService.get_session_messages(db, session_id)
+        return Response(
+            messages_adapter.dump_json(messages_adapter.validate_python(messages, from_attributes=True)),
+            media_type="application/json"
+        )
     
     except HTTPException:
         raise
@@ -77,37 +107,41 @@ async def get_session_messages(
 async def send_message(
     session_id: int,
     message: ChatMessageCreate,
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Send a message to a chat session and get AI response."""
     try:
         # Verify session belongs to user
-        session = ChatService.get_session_by_id(db, session_id)
+        session = await ChatService.get_session_by_id(db, session_id)
         if not session or session.user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat session not found"
             )
         
-        # Add user message to database
-        user_message = ChatService.add_message_to_session(
-            db, session_id, message.content, "user"
-        )
-        
         # Get previous messages for context
-        previous_messages = ChatService.get_session_messages(db, session_id)
+        previous_messages = await ChatService.get_recent_messages(db, session_id)
         
         # Generate title for the chat if this is the first user message
-        user_messages_count = len([msg for msg in previous_messages if msg.sender_type == "user"])
-        if user_messages_count == 1:  # This is the first user message
+        new_title = None
+        if not await ChatService.has_user_messages(db, session_id):
             try:
                 new_title = await openrouter_service.generate_chat_title(message.content)
-                ChatService.update_session_title(db, session_id, new_title)
-                logger.info(f"Updated session {session_id} title to: {new_title}")
             except Exception as e:
                 logger.error(f"Failed to generate title for session {session_id}: {e}")
         
+        # Add user message and title to database in one transaction
+        user_message = await ChatService.add_message_to_session(
+            db, session_id, message.content, "user", commit=False
+        )
+        if new_title:
+            await ChatService.update_session_title(db, session_id, new_title, commit=False)
+        await db.commit()
+        if new_title:
+            logger.info(f"Updated session {session_id} title to: {new_title}")
+        previous_messages.append(user_message)
+        
         # Format messages for OpenRouter API
         formatted_messages = openrouter_service.format_messages_for_api(previous_messages)
         
@@ -116,7 +150,7 @@ async def send_message(
         ai_response_text = await openrouter_service.generate_response(formatted_messages)
         
         # Add AI response to database
-        ai_message = ChatService.add_message_to_session(
+        ai_message = await ChatService.add_message_to_session(
             db, session_id, ai_response_text, "bot"
         )
         
@@ -135,13 +169,13 @@ async def send_message(
 @router.delete("/sessions/{session_id}", response_model=APIResponse)
 async def delete_chat_session(
     session_id: int,
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a chat session."""
     try:
         # Verify session belongs to user
-        session = ChatService.get_session_by_id(db, session_id)
+        session = await ChatService.get_session_by_id(db, session_id)
         if not session or session.user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -149,8 +183,8 @@ async def delete_chat_session(
             )
         
         # Delete session (this will cascade delete messages)
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await db.commit()
         
         return APIResponse(
             success=True,
@@ -171,69 +205,74 @@ async def delete_chat_session(
 async def send_message_stream(
     session_id: int,
     message: ChatMessageCreate,
-    current_user: UserResponse = Depends(get_current_user_dependency),
-    db: Session = Depends(get_db)
+    current_user: AuthCtx = Depends(get_current_user_dependency),
+    db: AsyncSession = Depends(get_db)
 ):
     """Send a message and stream the AI response for better UX."""
     try:
         # Verify session belongs to user
-        session = ChatService.get_session_by_id(db, session_id)
+        session = await ChatService.get_session_by_id(db, session_id)
         if not session or session.user_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat session not found"
             )
         
+        # Check for the first user message before adding this one
+        is_first_message = not await ChatService.has_user_messages(db, session_id)
+        
+        # Get previous messages for context
+        previous_messages = await ChatService.get_recent_messages(db, session_id)
+        
         # Add user message to database
-        user_message = ChatService.add_message_to_session(
+        user_message = await ChatService.add_message_to_session(
             db, session_id, message.content, "user"
         )
+        previous_messages.append(user_message)
+        
+        # Generate title for the chat if this is the first user message, concurrently
+        # with the response so it does not delay the first token. It is saved on its
+        # own as soon as it is ready, so a failed or abandoned stream does not lose it
+        title_task = None
+        if is_first_message:
+            title_task = asyncio.create_task(_generate_and_save_title(session_id, message.content))
+            _title_tasks.add(title_task)
+            title_task.add_done_callback(_title_tasks.discard)
         
         async def generate_stream():
             try:
-                # Get previous messages for context
-                previous_messages = ChatService.get_session_messages(db, session_id)
-                
-                # Generate title for the chat if this is the first user message
-                user_messages_count = len([msg for msg in previous_messages if msg.sender_type == "user"])
-                if user_messages_count == 1:  # This is the first user message
-                    try:
-                        new_title = await openrouter_service.generate_chat_title(message.content)
-                        ChatService.update_session_title(db, session_id, new_title)
-                        logger.info(f"Updated session {session_id} title to: {new_title}")
-                    except Exception as e:
-                        logger.error(f"Failed to generate title for session {session_id}: {e}")
-                
                 # Format messages for OpenRouter API
                 formatted_messages = openrouter_service.format_messages_for_api(previous_messages)
                 
-                # Generate AI response using OpenRouter with streaming
-                ai_response_text = await openrouter_service.generate_response(formatted_messages, stream=True)
+                # Forward each chunk to the client as it arrives from OpenRouter. A failure
+                # mid-stream raises, so the partial reply is reported as an error, not saved
+                chunks = []
+                async for chunk in openrouter_service.stream_response(formatted_messages):
+                    chunks.append(chunk)
+                    yield SSE_PREFIX + orjson.dumps({"content": chunk}) + SSE_SUFFIX
+                
+                ai_response_text = "".join(chunks).strip() or "I couldn't generate a response. Please try again."
                 
                 # Add AI response to database
-                ai_message = ChatService.add_message_to_session(
+                await ChatService.add_message_to_session(
                     db, session_id, ai_response_text, "bot"
                 )
                 
-                # Stream the complete response
-                response_data = {
-                    "id": ai_message.id,
-                    "content": ai_response_text,
-                    "sender_type": "bot",
-                    "created_at": ai_message.created_at.isoformat()
-                }
+                # Let the title land before [DONE] so a session refresh picks it up;
+                # wait() does not cancel the task if this stream is cancelled
+                if title_task:
+                    await asyncio.wait([title_task])
                 
-                yield f"data: {json.dumps(response_data)}\n\n"
-                yield f"data: [DONE]\n\n"
+                yield SSE_DONE
                 
             except Exception as e:
                 logger.error(f"Streaming error: {e}")
                 error_data = {"error": "Failed to generate response"}
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield SSE_PREFIX + orjson.dumps(error_data) + SSE_SUFFIX
         
         return StreamingResponse(
             generate_stream(),
-            media_type="text/plain",
+            media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from dataclasses import dataclass
 from typing import Optional, List
 from datetime import datetime
 
@@ -30,6 +31,13 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+# Authenticated user passed to route handlers; a plain dataclass so the
+# per-request auth path does no pydantic validation
+@dataclass(slots=True)
+class AuthCtx:
+    id: int
+    email: str
+
 # Chat Schemas
 class ChatMessageCreate(BaseModel):
     content: str
@@ -17,9 +17,21 @@ class OpenRouterService:
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
-            "HTTP-Referer": {settings.site_url},  # Your site URL
+            "HTTP-Referer": settings.site_url,  # Your site URL
             "X-Title": "AI Chatbot App"  # Your app name
         }
+        # Long-lived client so connections to OpenRouter are kept alive and reused
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+        )
+    
+    async def aclose(self):
+        """Close the underlying HTTP client."""
+        await self._client.aclose()
     
     async def generate_response(self, messages: List[Dict[str, str]], stream: bool = False) -> str:
         """
@@ -45,12 +57,11 @@ class OpenRouterService:
                 "stream": stream
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if stream:
-                    return await self._stream_response(client, payload)
-                else:
-                    return await self._get_complete_response(client, payload)
-                    
+            if stream:
+                return await self._stream_response(payload)
+            else:
+                return await self._get_complete_response(payload)
+                
         except httpx.TimeoutException:
             logger.error("OpenRouter API request timed out")
             return "I apologize, but I'm taking too long to respond. Please try again."
@@ -61,13 +72,9 @@ class OpenRouterService:
             logger.error(f"Unexpected error with OpenRouter API: {e}")
             return "I encountered an unexpected error. Please try again."
     
-    async def _get_complete_response(self, client: httpx.AsyncClient, payload: dict) -> str:
+    async def _get_complete_response(self, payload: dict) -> str:
         """Get complete response from OpenRouter API."""
-        response = await client.post(
-            f"{self.base_url}/chat/completions",
-            headers=self.headers,
-            json=payload
-        )
+        response = await self._client.post("/chat/completions", json=payload)
         
         response.raise_for_status()
         data = response.json()
@@ -78,16 +85,54 @@ class OpenRouterService:
             logger.error(f"Unexpected OpenRouter response format: {data}")
             return "I received an unexpected response format. Please try again."
     
-    async def _stream_response(self, client: httpx.AsyncClient, payload: dict) -> str:
+    async def stream_response(self, messages: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
+        """
+        Stream AI response chunks from OpenRouter API as they arrive.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+        
+        Yields:
+            AI response text chunks
+        
+        Raises:
+            Any API or connection error, after logging it, so callers can tell
+            a failed response apart from its content
+        """
+        if not self.api_key:
+            logger.error("OpenRouter API key is not configured")
+            raise RuntimeError("OpenRouter API key is not configured")
+        
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 2000,
+            "temperature": 0.7,
+            "stream": True
+        }
+        
+        try:
+            async for chunk in self._iter_stream(payload):
+                yield chunk
+        except httpx.TimeoutException:
+            logger.error("OpenRouter API request timed out")
+            raise
+        except httpx.RequestError as e:
+            logger.error(f"OpenRouter API request failed: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error with OpenRouter API: {e}")
+            raise
+    
+    async def _stream_response(self, payload: dict) -> str:
         """Stream response from OpenRouter API and return complete text."""
-        full_response = ""
+        full_response = "".join([chunk async for chunk in self._iter_stream(payload)])
         
-        async with client.stream(
-            "POST",
-            f"{self.base_url}/chat/completions",
-            headers=self.headers,
-            json=payload
-        ) as response:
+        return full_response.strip() if full_response else "I couldn't generate a response. Please try again."
+    
+    async def _iter_stream(self, payload: dict) -> AsyncGenerator[str, None]:
+        """Yield content deltas from a streaming OpenRouter response."""
+        async with self._client.stream("POST", "/chat/completions", json=payload) as response:
             response.raise_for_status()
             
             async for line in response.aiter_lines():
@@ -101,38 +146,46 @@ class OpenRouterService:
                         data = json.loads(data_str)
                         if "choices" in data and len(data["choices"]) > 0:
                             delta = data["choices"][0].get("delta", {})
-                            if "content" in delta:
-                                full_response += delta["content"]
+                            if delta.get("content"):
+                                yield delta["content"]
                     except json.JSONDecodeError:
                         continue
-        
-        return full_response.strip() if full_response else "I couldn't generate a response. Please try again."
     
-    def format_messages_for_api(self, chat_messages: List) -> List[Dict[str, str]]:
+    def format_messages_for_api(self, chat_messages: List, max_chars: int = 12000) -> List[Dict[str, str]]:
         """
         Convert chat messages to OpenRouter API format.
         
+        Only the most recent messages that fit in max_chars are kept, so the
+        request size stays bounded however long the chat gets. The latest
+        message is always included.
+        
         Args:
-            chat_messages: List of ChatMessage objects from database
+            chat_messages: List of ChatMessage objects from database, oldest first
+            max_chars: Character budget for the chat history
             
         Returns:
             List of formatted messages for API
         """
-        formatted_messages = []
-        
-        # Add system message to set the AI's behavior
-        formatted_messages.append({
-            "role": "system",
-            "content": "You are a helpful AI assistant. Provide informative, accurate, and engaging responses. Be concise but thorough in your answers."
-        })
-        
-        # Convert chat messages to API format
-        for msg in chat_messages:
+        # Convert chat messages to API format, newest first, until the budget is spent
+        history = []
+        remaining = max_chars
+        for msg in reversed(chat_messages):
+            if history and len(msg.content) > remaining:
+                break
+            remaining -= len(msg.content)
             role = "user" if msg.sender_type == "user" else "assistant"
-            formatted_messages.append({
+            history.append({
                 "role": role,
                 "content": msg.content
             })
+        history.reverse()
+        
+        # Add system message to set the AI's behavior
+        formatted_messages = [{
+            "role": "system",
+            "content": "You are a helpful AI assistant. Provide informative, accurate, and engaging responses. Be concise but thorough in your answers."
+        }]
+        formatted_messages.extend(history)
         
         return formatted_messages
     
@@ -1,96 +1,153 @@
-from sqlalchemy.orm import Session
+import asyncio
+from sqlalchemy import bindparam, exists, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.models.user import User, ChatSession, ChatMessage
 from app.schemas import UserCreate, ChatMessageCreate
-from app.utils.auth import get_password_hash, verify_password
+from app.utils.auth import get_password_hash, verify_and_update_password
 from typing import Optional, List
 
+# Hot reads, built once so their construction and compiled SQL are cached across requests
+_USER_BY_EMAIL = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
+_SESSION_BY_ID = lambda_stmt(lambda: select(ChatSession).where(ChatSession.id == bindparam("session_id")))
+_MSGS_BY_SESSION = lambda_stmt(
+    lambda: select(ChatMessage)
+    .where(ChatMessage.session_id == bindparam("session_id"))
+    .order_by(ChatMessage.created_at.asc())
+)
+
 class UserService:
     @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
+    async def create_user(db: AsyncSession, user: UserCreate) -> User:
         """Create a new user."""
-        hashed_password = get_password_hash(user.password)
+        # Hash off the event loop; Argon2/bcrypt are deliberately slow
+        hashed_password = await asyncio.to_thread(get_password_hash, user.password)
         db_user = User(
             email=user.email,
             name=user.name,
             hashed_password=hashed_password
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email."""
-        return db.query(User).filter(User.email == email).first()
+        result = await db.execute(_USER_BY_EMAIL, {"email": email})
+        return result.scalars().first()
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
         """Get user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
     
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password."""
-        user = UserService.get_user_by_email(db, email)
+        user = await UserService.get_user_by_email(db, email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await asyncio.to_thread(verify_and_update_password, password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            # Upgrade hashes from deprecated schemes or settings
+            user.hashed_password = new_hash
+            await db.commit()
         return user
 
 class ChatService:
     @staticmethod
-    def create_chat_session(db: Session, user_id: int, title: str = "New Chat") -> ChatSession:
+    async def create_chat_session(db: AsyncSession, user_id: int, title: str = "New Chat") -> ChatSession:
         """Create a new chat session."""
-        session = ChatSession(user_id=user_id, title=title)
+        # A new session has no messages; initialise the collection so it is never lazy loaded
+        session = ChatSession(user_id=user_id, title=title, messages=[])
         db.add(session)
-        db.commit()
-        db.refresh(session)
+        await db.commit()
+        await db.refresh(session, ["created_at"])
         return session
     
     @staticmethod
-    def get_user_chat_sessions(db: Session, user_id: int) -> List[ChatSession]:
+    async def get_user_chat_sessions(db: AsyncSession, user_id: int) -> List[ChatSession]:
         """Get all chat sessions for a user."""
-        return db.query(ChatSession).filter(ChatSession.user_id == user_id).order_by(ChatSession.updated_at.desc()).all()
+        result = await db.execute(
+            select(ChatSession)
+            .where(ChatSession.user_id == user_id)
+            .options(selectinload(ChatSession.messages))
+            .order_by(ChatSession.updated_at.desc())
+        )
+        return result.scalars().all()
     
     @staticmethod
-    def add_message_to_session(db: Session, session_id: int, content: str, sender_type: str) -> ChatMessage:
-        """Add a message to a chat session."""
+    async def add_message_to_session(
+        db: AsyncSession, session_id: int, content: str, sender_type: str, commit: bool = True
+    ) -> ChatMessage:
+        """Add a message to a chat session. With commit=False it is only flushed, for the caller to commit."""
         message = ChatMessage(
             session_id=session_id,
             content=content,
             sender_type=sender_type
         )
         db.add(message)
-        db.commit()
-        db.refresh(message)
         
-        # Update session's updated_at timestamp
-        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-        if session:
-            from sqlalchemy import func
-            session.updated_at = func.now()
-            db.commit()
+        # The session's updated_at is touched by a trigger on chat_messages
+        if commit:
+            await db.commit()
+            await db.refresh(message)
+        else:
+            await db.flush()
         
         return message
     
     @staticmethod
-    def get_session_messages(db: Session, session_id: int) -> List[ChatMessage]:
+    async def get_session_messages(db: AsyncSession, session_id: int) -> List[ChatMessage]:
         """Get all messages for a chat session."""
-        return db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.created_at.asc()).all()
+        result = await db.execute(_MSGS_BY_SESSION, {"session_id": session_id})
+        return result.scalars().all()
+    
+    @staticmethod
+    async def get_recent_messages(db: AsyncSession, session_id: int, limit: int = 30) -> List[ChatMessage]:
+        """Get the latest messages for a chat session, oldest first."""
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(limit)
+        )
+        messages = result.scalars().all()
+        messages.reverse()
+        return messages
+    
+    @staticmethod
+    async def has_user_messages(db: AsyncSession, session_id: int) -> bool:
+        """Check whether a chat session already has a message from the user."""
+        result = await db.execute(
+            select(
+                exists().where(ChatMessage.session_id == session_id, ChatMessage.sender_type == "user")
+            )
+        )
+        return result.scalar()
     
     @staticmethod
-    def get_session_by_id(db: Session, session_id: int) -> Optional[ChatSession]:
+    async def get_session_by_id(db: AsyncSession, session_id: int) -> Optional[ChatSession]:
         """Get chat session by ID."""
-        return db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        result = await db.execute(_SESSION_BY_ID, {"session_id": session_id})
+        return result.scalars().first()
     
     @staticmethod
-    def update_session_title(db: Session, session_id: int, title: str) -> Optional[ChatSession]:
-        """Update chat session title."""
-        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    async def update_session_title(
+        db: AsyncSession, session_id: int, title: str, commit: bool = True
+    ) -> Optional[ChatSession]:
+        """Update chat session title. With commit=False it is only flushed, for the caller to commit."""
+        session = await ChatService.get_session_by_id(db, session_id)
         if session:
             session.title = title
-            db.commit()
-            db.refresh(session)
+            if commit:
+                await db.commit()
+                await db.refresh(session)
+            else:
+                await db.flush()
         return session
@@ -1,3 +1,3 @@
-from .auth import verify_password, get_password_hash, create_access_token, verify_token
+from .auth import verify_password, verify_and_update_password, get_password_hash, create_access_token, decode_token, verify_token
 
-__all__ = ["verify_password", "get_password_hash", "create_access_token", "verify_token"]
+__all__ = ["verify_password", "verify_and_update_password", "get_password_hash", "create_access_token", "decode_token", "verify_token"]
@@ -1,16 +1,33 @@
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+import jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from app.config import settings
 
+# JWT settings, bound once at import for the per-request token paths
+_SECRET = settings.secret_key
+_ALG = settings.algorithm
+_ALGS = [_ALG]
+_DECODE_OPTIONS = {"require": ["exp"]}
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# New hashes use Argon2id; bcrypt hashes still verify and are upgraded on login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=65536,
+    argon2__parallelism=2
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
@@ -24,16 +41,22 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=15)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, _SECRET, algorithm=_ALG)
     return encoded_jwt
 
+def decode_token(token: str) -> Optional[dict]:
+    """Verify a JWT token and return its claims if valid."""
+    try:
+        return jwt.decode(token, _SECRET, algorithms=_ALGS, options=_DECODE_OPTIONS)
+    except jwt.PyJWTError:
+        return None
+
 def verify_token(token: str) -> Optional[str]:
     """Verify a JWT token and return the email if valid."""
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
-    except JWTError:
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
         return None
+    return email
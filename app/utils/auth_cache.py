@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+import time
+from typing import Optional
+from cachetools import TLRUCache, TTLCache
+from app.schemas import AuthCtx
+
+# Verified token claims, keyed by a truncated SHA-256 of the token so raw
+# bearer tokens are never kept in memory. A token's signature cannot change,
+# so entries live until the token's own exp and only that is rechecked on reuse
+_token_cache: TLRUCache = TLRUCache(maxsize=10000, ttu=lambda _key, entry, _now: entry[1], timer=time.time)
+
+# Authenticated users, keyed by email so every token of a user shares one entry
+_user_cache: TTLCache = TTLCache(maxsize=5000, ttl=60)
+
+_lock = asyncio.Lock()
+
+def token_key(token: str) -> bytes:
+    """Return the cache key for a bearer token."""
+    return hashlib.sha256(token.encode()).digest()[:16]
+
+async def get_token_email(key: bytes) -> Optional[str]:
+    """Return the email of a previously verified token if it has not expired."""
+    async with _lock:
+        entry = _token_cache.get(key)
+    if entry is None:
+        return None
+
+    email, expires_at = entry
+    if expires_at <= time.time():
+        return None
+    return email
+
+async def set_token_email(key: bytes, email: str, exp: float) -> None:
+    """Cache the email of a verified token until the token expires."""
+    async with _lock:
+        _token_cache[key] = (email, exp)
+
+async def get_user(email: str) -> Optional[AuthCtx]:
+    """Return the cached user for an email."""
+    async with _lock:
+        return _user_cache.get(email)
+
+async def set_user(email: str, user: AuthCtx) -> None:
+    """Cache an authenticated user."""
+    async with _lock:
+        _user_cache[email] = user
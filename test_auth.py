@@ -4,13 +4,31 @@ Test script to verify authentication endpoints are working correctly.
 Run this script to test login and user fetching functionality.
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
+import os
 
 # Base URL for your API
 BASE_URL = "http://localhost:8000"
 
-def test_registration():
+# Set TEST_VERBOSE=1 to print full response bodies
+VERBOSE = os.getenv("TEST_VERBOSE") == "1"
+
+# Fail fast on a dead backend instead of hanging the run
+TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+
+# One client per run so connections are kept alive and shared by concurrent calls
+client = httpx.AsyncClient(
+    base_url=BASE_URL,
+    headers={"Content-Type": "application/json"},
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+    timeout=TIMEOUT,
+    follow_redirects=False
+)
+
+async def test_registration():
     """Test user registration"""
     print("Testing registration...")
     
@@ -21,9 +39,10 @@ def test_registration():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/auth/register", json=user_data)
+        response = await client.post("/auth/register", json=user_data)
         print(f"Registration Response: {response.status_code}")
-        print(f"Response Data: {response.json()}")
+        if VERBOSE:
+            print(f"Response Data: {response.content.decode()}")
         
         if response.status_code == 200:
             print("✅ Registration successful!")
@@ -35,7 +54,7 @@ def test_registration():
         print(f"❌ Registration error: {e}")
         return False
 
-def test_login():
+async def test_login():
     """Test user login"""
     print("\nTesting login...")
     
@@ -45,10 +64,11 @@ def test_login():
     }
     
     try:
-        response = requests.post(f"{BASE_URL}/auth/login", json=login_data)
+        response = await client.post("/auth/login", json=login_data)
         print(f"Login Response: {response.status_code}")
-        response_data = response.json()
-        print(f"Response Data: {json.dumps(response_data, indent=2)}")
+        response_data = orjson.loads(response.content)
+        if VERBOSE:
+            print(f"Response Data: {orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode()}")
         
         if response.status_code == 200 and response_data.get("success"):
             print("✅ Login successful!")
@@ -60,20 +80,17 @@ def test_login():
         print(f"❌ Login error: {e}")
         return None
 
-def test_get_current_user(token):
+async def test_get_current_user(token):
     """Test getting current user with token"""
     print("\nTesting get current user...")
     
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    headers = {"Authorization": f"Bearer {token}"}
     
     try:
-        response = requests.get(f"{BASE_URL}/auth/me", headers=headers)
+        response = await client.get("/auth/me", headers=headers)
         print(f"Get User Response: {response.status_code}")
-        response_data = response.json()
-        print(f"Response Data: {json.dumps(response_data, indent=2)}")
+        if VERBOSE:
+            print(f"Response Data: {orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()}")
         
         if response.status_code == 200:
             print("✅ Get current user successful!")
@@ -85,26 +102,26 @@ def test_get_current_user(token):
         print(f"❌ Get current user error: {e}")
         return False
 
-def test_chat_sessions(token):
+async def test_chat_sessions(token):
     """Test chat sessions endpoint"""
     print("\nTesting chat sessions...")
     
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    headers = {"Authorization": f"Bearer {token}"}
     
     try:
-        # Test getting sessions
-        response = requests.get(f"{BASE_URL}/chat/sessions", headers=headers)
-        print(f"Get Sessions Response: {response.status_code}")
-        print(f"Sessions: {response.json()}")
+        # Test getting and creating sessions concurrently
+        list_response, response = await asyncio.gather(
+            client.get("/chat/sessions", headers=headers),
+            client.post("/chat/sessions?title=Test Session", headers=headers)
+        )
+        print(f"Get Sessions Response: {list_response.status_code}")
+        if VERBOSE:
+            print(f"Sessions: {list_response.content.decode()}")
         
-        # Test creating a session
-        response = requests.post(f"{BASE_URL}/chat/sessions?title=Test Session", headers=headers)
         print(f"Create Session Response: {response.status_code}")
-        session_data = response.json()
-        print(f"New Session: {json.dumps(session_data, indent=2)}")
+        session_data = orjson.loads(response.content)
+        if VERBOSE:
+            print(f"New Session: {orjson.dumps(session_data, option=orjson.OPT_INDENT_2).decode()}")
         
         if response.status_code == 200:
             print("✅ Chat sessions working!")
@@ -116,34 +133,39 @@ def test_chat_sessions(token):
         print(f"❌ Chat sessions error: {e}")
         return None
 
-def main():
+async def main():
     """Run all tests"""
     print("🚀 Starting API Tests...\n")
     
-    # Test registration (might fail if user already exists)
-    test_registration()
-    
-    # Test login
-    token = test_login()
-    
-    if not token:
-        print("\n❌ Cannot proceed without valid token")
-        return
-    
-    # Test getting current user
-    if not test_get_current_user(token):
-        print("\n❌ User authentication is not working properly")
-        return
-    
-    # Test chat functionality
-    session_id = test_chat_sessions(token)
-    
-    if session_id:
-        print(f"\n✅ All tests passed! Chat functionality is working.")
-    else:
-        print(f"\n⚠️ Authentication works but chat functionality has issues.")
-    
-    print("\n🎉 Test completed!")
+    try:
+        # Test registration (might fail if user already exists)
+        await test_registration()
+        
+        # Test login
+        token = await test_login()
+        
+        if not token:
+            print("\n❌ Cannot proceed without valid token")
+            return
+        
+        # Test getting current user and chat functionality concurrently
+        user_ok, session_id = await asyncio.gather(
+            test_get_current_user(token),
+            test_chat_sessions(token)
+        )
+        
+        if not user_ok:
+            print("\n❌ User authentication is not working properly")
+            return
+        
+        if session_id:
+            print(f"\n✅ All tests passed! Chat functionality is working.")
+        else:
+            print(f"\n⚠️ Authentication works but chat functionality has issues.")
+        
+        print("\n🎉 Test completed!")
+    finally:
+        await client.aclose()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())